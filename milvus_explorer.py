@@ -7,11 +7,77 @@ Milvus Lite数据库查询工具
 """
 
 import argparse
+import heapq
+import json
+import logging
 import os
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from pymilvus import MilvusClient
 from tabulate import tabulate
-import numpy as np
-import json
+
+# 可选依赖: pip install orjson (或 pip install -e ".[orjson]")
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# 本地重选top_k时各度量的排序方向
+SMALLER_IS_BETTER_METRICS = {"L2", "HAMMING", "JACCARD"}
+LARGER_IS_BETTER_METRICS = {"IP", "COSINE"}
+
+# 超过该条数时使用制表符分隔的快速输出，而不是tabulate对齐
+BULK_OUTPUT_THRESHOLD = 1000
+
+
+def _truncate(text, width=100):
+    """将过长的文本截断为不超过width个字符"""
+    if len(text) > width:
+        return text[:width - 3] + "..."
+    return text
+
+
+# 制表符分隔输出时需要转义的控制字符，保证每条数据只占一行
+_CELL_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _escape_cell(value):
+    """转义单元格中的反斜杠、制表符和换行符"""
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    return str(value).translate(_CELL_ESCAPES)
+
+
+class _MvccTsWarningFilter(logging.Filter):
+    """过滤pymilvus迭代器在Milvus Lite上无法获取mvccTs时的告警"""
+
+    def filter(self, record):
+        return "mvccTs" not in record.getMessage()
+
+
+def _dumps_metadata(metadata):
+    """将元数据序列化为JSON字符串，优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(metadata or {}).decode()
+    # 与orjson的紧凑格式保持一致，输出不随是否安装orjson而变化
+    return json.dumps(metadata or {}, ensure_ascii=False, separators=(",", ":"))
+
+
+def _quantize(embs, method):
+    """在本地量化一批向量用于预览，返回量化后的数组及(重建的)范数"""
+    if method == "int8":
+        scale = np.abs(embs).max(axis=1, keepdims=True)
+        scale[scale == 0] = 1.0
+        q = np.clip(np.round(embs / scale * 127), -128, 127).astype(np.int8)
+        norms = np.linalg.norm(q.astype(np.float32), axis=1) * scale[:, 0] / 127
+        return q, norms
+    # binary: 每个维度只保留符号位
+    q = (embs > 0).astype(np.uint8)
+    return q, np.linalg.norm(embs, axis=1)
 
 
 def main():
@@ -21,6 +87,11 @@ def main():
     )
     parser.add_argument("--token", type=str, default="root:Milvus", help="认证令牌")
     parser.add_argument("--db", type=str, default="default", help="数据库名称")
+    parser.add_argument(
+        "--consistency_level", type=str, default="Eventually",
+        choices=["Strong", "Bounded", "Session", "Eventually"],
+        help="查询/搜索的一致性级别(默认Eventually: 无需等待时间戳同步，延迟最低，但可能看不到刚写入的数据)"
+    )
     parser.add_argument(
         "--collection", type=str, default=None, help="要查询的集合名称(如果不指定则列出所有集合)"
     )
@@ -36,6 +107,14 @@ def main():
     parser.add_argument(
         "--vector_preview", type=int, default=5, help="显示向量的前几个元素(默认5)"
     )
+    parser.add_argument(
+        "--quantize", type=str, choices=["int8", "binary"], default=None,
+        help="配合--show_vectors使用，以int8或二值量化后的形式预览向量"
+    )
+    parser.add_argument(
+        "--no_fetch_full_vector", action="store_true",
+        help="配合--show_vectors使用，不传输完整向量，仅根据schema显示向量维度"
+    )
     parser.add_argument(
         "--search", action="store_true", help="执行向量相似度搜索"
     )
@@ -45,12 +124,26 @@ def main():
     parser.add_argument(
         "--search_vector", type=str, default=None, help="要搜索的向量，格式为JSON数组"
     )
+    parser.add_argument(
+        "--search_vector_file", type=str, default=None, help="从.npy文件加载要搜索的向量"
+    )
     parser.add_argument(
         "--search_id", type=int, default=None, help="使用指定ID的数据作为搜索向量"
     )
     parser.add_argument(
         "--top_k", type=int, default=5, help="返回前k个最相似的结果(默认5)"
     )
+    parser.add_argument(
+        "--oversample", type=float, default=1.0,
+        help="过采样倍数，向服务端请求top_k*F个候选后在本地重新选出top_k个(默认1.0)"
+    )
+    parser.add_argument(
+        "--metric", type=str, choices=["L2", "IP", "COSINE"], default=None,
+        help="搜索使用的距离度量(默认读取集合索引的度量类型)"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="出错时打印完整的异常堆栈"
+    )
     
     args = parser.parse_args()
     
@@ -85,11 +178,12 @@ def main():
             # 优先使用search_id
             if args.search_id is not None:
                 try:
-                    result = client.query(
+                    # 直接按主键获取，无需解析过滤表达式
+                    result = client.get(
                         collection_name=args.collection,
-                        filter=f"id == {args.search_id}",
+                        ids=[args.search_id],
                         output_fields=["embedding"],
-                        limit=1
+                        consistency_level=args.consistency_level
                     )
                     if result and "embedding" in result[0]:
                         search_vector = result[0]["embedding"]
@@ -103,7 +197,9 @@ def main():
             # 其次使用search_vector
             elif args.search_vector:
                 try:
-                    search_vector = json.loads(args.search_vector)
+                    # 优先使用orjson解析长向量，未安装时回退到标准库json
+                    loads = orjson.loads if orjson is not None else json.loads
+                    search_vector = loads(args.search_vector)
                     if not isinstance(search_vector, list):
                         print("错误: 搜索向量必须是JSON数组格式")
                         return
@@ -111,60 +207,101 @@ def main():
                 except json.JSONDecodeError:
                     print("错误: 搜索向量必须是有效的JSON数组")
                     return
+            # 也可以从.npy文件加载向量，跳过JSON解析
+            elif args.search_vector_file:
+                try:
+                    search_vector = np.load(args.search_vector_file).astype(np.float32).reshape(-1)
+                    print(f"使用文件 '{args.search_vector_file}' 中的向量进行搜索 (维度: {len(search_vector)})")
+                except Exception as e:
+                    print(f"错误: 无法从文件 '{args.search_vector_file}' 加载向量: {e}")
+                    return
             # 最后尝试使用search_text
             elif args.search_text:
-                print(f"错误: 文本搜索需要嵌入模型，此功能尚未实现")
-                print(f"提示: 请使用 --search_vector 或 --search_id 参数进行搜索")
+                print("错误: 文本搜索需要嵌入模型，此功能尚未实现")
+                print("提示: 请使用 --search_vector 或 --search_id 参数进行搜索")
                 return
             else:
-                print("错误: 必须提供搜索向量 (--search_vector) 或 搜索ID (--search_id) 或 搜索文本 (--search_text)")
+                print("错误: 必须提供搜索向量 (--search_vector 或 --search_vector_file) 或 搜索ID (--search_id) 或 搜索文本 (--search_text)")
                 return
                 
+            # 统一转换为连续的float32数组，pymilvus可直接序列化而无需逐元素转换
+            search_vector = np.asarray(search_vector, dtype=np.float32)
+
+            # 确定距离度量：优先使用命令行参数，否则读取索引的度量类型，避免度量不一致
+            index_metric = None
+            try:
+                index_info = client.describe_index(collection_name=args.collection, index_name="embedding")
+                if index_info:
+                    index_metric = index_info.get("metric_type")
+            except Exception:
+                index_metric = None
+            metric_type = args.metric or index_metric or "L2"
+
+            # 余弦相似度下预先归一化查询向量，若索引为IP则可直接使用内积计算
+            if metric_type == "COSINE":
+                norm = np.linalg.norm(search_vector)
+                if norm > 0:
+                    search_vector = search_vector / norm
+                if index_metric == "IP":
+                    metric_type = "IP"
+
             # 执行向量搜索
             try:
                 search_results = client.search(
                     collection_name=args.collection,
-                    data=[search_vector],
+                    data=search_vector.reshape(1, -1),
                     anns_field="embedding",  # 向量字段名
-                    param={"metric_type": "L2"},  # 或者 "IP", "COSINE" 等
-                    limit=args.top_k,
-                    output_fields=["text", "reference", "metadata"]
+                    search_params={"metric_type": metric_type},
+                    limit=max(args.top_k, int(args.top_k * args.oversample)),
+                    output_fields=["text", "reference", "metadata"],
+                    consistency_level=args.consistency_level
                 )
                 
                 if not search_results or not search_results[0]:
-                    print(f"未找到相似结果")
+                    print("未找到相似结果")
                     return
-                    
-                print(f"\n找到 {len(search_results[0])} 个相似结果:")
-                
-                for i, hit in enumerate(search_results[0]):
-                    print(f"\n--- 相似结果 #{i+1} (相似度得分: {hit['score']:.4f}) ---")
-                    
-                    # 显示文本内容
-                    if "text" in hit:
-                        text = hit["text"]
-                        if len(text) > 100:
-                            text = text[:97] + "..."
-                        print(f"文本: {text}")
-                    
-                    # 显示参考信息
-                    if "reference" in hit:
-                        print(f"参考: {hit['reference']}")
-                    
-                    # 显示元数据
-                    if "metadata" in hit and hit["metadata"]:
-                        print("元数据:")
-                        for key, value in hit["metadata"].items():
-                            print(f"  {key}: {value}")
-                            
-                    # 显示ID信息
-                    if "id" in hit:
-                        print(f"ID: {hit['id']}")
-                    
+
+                # 过采样时在本地用堆选出最好的top_k个，距离类度量越小越相似，IP/COSINE越大越相似
+                hits = search_results[0]
+                if len(hits) > args.top_k:
+                    if metric_type in SMALLER_IS_BETTER_METRICS:
+                        hits = heapq.nsmallest(args.top_k, hits, key=lambda h: h["distance"])
+                    elif metric_type in LARGER_IS_BETTER_METRICS:
+                        hits = heapq.nlargest(args.top_k, hits, key=lambda h: h["distance"])
+                    else:
+                        # 未知度量无法判断排序方向，沿用服务端返回的顺序
+                        hits = hits[:args.top_k]
+
+                print(f"\n找到 {len(hits)} 个相似结果:")
+
+                # MilvusClient.search返回的每个结果为 {"id", "distance", "entity"}，输出字段位于entity中
+                rows = []
+                for i, hit in enumerate(hits):
+                    entity = hit.get("entity") or {}
+                    rows.append([
+                        i + 1,
+                        hit["distance"],
+                        hit.get("id", ""),
+                        _truncate(entity.get("text") or ""),
+                        entity.get("reference", ""),
+                        _dumps_metadata(entity.get("metadata")),
+                    ])
+                sys.stdout.write(
+                    tabulate(
+                        rows,
+                        headers=["#", "相似度得分", "ID", "文本", "参考", "元数据"],
+                        tablefmt="plain",
+                        floatfmt=".4f",
+                        # 文本、参考和元数据按原样显示，避免"007"之类的内容被当作数字改写
+                        disable_numparse=[3, 4, 5],
+                    )
+                    + "\n"
+                )
+
             except Exception as e:
                 print(f"执行向量搜索失败: {e}")
-                import traceback
-                traceback.print_exc()
+                if args.verbose:
+                    traceback.print_exc()
                 
             return
                 
@@ -181,25 +318,31 @@ def main():
                 return
                 
             print("\n集合列表:")
-            collection_data = []
-            for collection in collections:
+
+            # 一些版本的pymilvus可能支持get_collection_stats方法，只需检查一次
+            has_stats = hasattr(client, "get_collection_stats")
+
+            def fetch_meta(collection):
                 try:
                     description = client.describe_collection(collection)
                     # 尝试获取集合中的数据量
                     try:
                         count = "未知"
-                        # 一些版本的pymilvus可能支持get_collection_stats方法
-                        if hasattr(client, "get_collection_stats"):
+                        if has_stats:
                             stats = client.get_collection_stats(collection)
                             if stats and "row_count" in stats:
                                 count = stats["row_count"]
                     except Exception:
                         count = "未知"
-                    
-                    collection_data.append([collection, description.get("description", ""), count])
+
+                    return [collection, description.get("description", ""), count]
                 except Exception as e:
-                    collection_data.append([collection, f"获取信息失败: {e}", "未知"])
-            
+                    return [collection, f"获取信息失败: {e}", "未知"]
+
+            # 并发获取各集合的元数据，ex.map保持原有顺序
+            with ThreadPoolExecutor(max_workers=min(16, len(collections))) as ex:
+                collection_data = list(ex.map(fetch_meta, collections))
+
             print(tabulate(collection_data, headers=["集合名称", "描述", "数据量"], tablefmt="grid"))
         except Exception as e:
             print(f"获取集合列表失败: {e}")
@@ -221,85 +364,165 @@ def main():
                 # 获取字段列表
                 fields = description.get("fields", [])
                 
-                # 确定输出字段
+                # 确定输出字段：只遍历一次schema，之后全部使用集合运算
+                field_names = [field.get("name") for field in fields]
+                names = set(field_names)
                 if args.show_vectors:
-                    field_names = [field.get("name") for field in fields if field.get("name") != "id"]
-                    output_fields = field_names
+                    wanted = names - {"id"}
+                    # 不拉取完整向量，节省 dim*4*N 字节的传输
+                    if args.no_fetch_full_vector:
+                        wanted.discard("embedding")
                 else:
-                    field_names = [field.get("name") for field in fields if field.get("name") not in ["id", "embedding"]]
                     # 确保要输出的字段存在
-                    output_fields = ["text", "reference", "metadata"]
-                    output_fields = [field for field in output_fields if field in field_names]
-                
+                    wanted = {"text", "reference", "metadata"} & names
+
                 # 始终添加id字段
-                if "id" not in output_fields:
-                    output_fields.append("id")
-                
-                if not output_fields:
-                    print(f"警告: 集合中没有可显示的字段")
-                    return
-                
-                # 查询数据
-                results = client.query(
-                    collection_name=args.collection, 
-                    filter="",
-                    output_fields=output_fields,
-                    limit=args.limit,
-                    offset=args.offset
-                )
-                
-                if not results:
-                    print(f"集合 '{args.collection}' 中没有数据")
-                    return
-                
-                print(f"\n数据 (显示 {args.offset + 1} - {args.offset + len(results)} 条):")
-                
+                wanted.add("id")
+                output_fields = list(wanted)
+
                 # 显示数据
-                for i, item in enumerate(results):
-                    print(f"\n--- 数据 #{args.offset + i + 1} ---")
-                    
-                    # 显示ID信息
-                    if "id" in item:
-                        print(f"ID: {item['id']}")
-                    
-                    # 显示文本内容
-                    if "text" in item:
-                        text = item["text"]
-                        if len(text) > 100:
-                            text = text[:97] + "..."
-                        print(f"文本: {text}")
-                    
-                    # 显示参考信息
-                    if "reference" in item:
-                        print(f"参考: {item['reference']}")
-                    
-                    # 显示元数据
-                    if "metadata" in item and item["metadata"]:
-                        print("元数据:")
-                        for key, value in item["metadata"].items():
-                            print(f"  {key}: {value}")
-                    
-                    # 显示向量数据
-                    if args.show_vectors and "embedding" in item:
-                        embedding = item["embedding"]
-                        if isinstance(embedding, list) or isinstance(embedding, np.ndarray):
-                            dim = len(embedding)
-                            preview = embedding[:args.vector_preview]
-                            print(f"向量数据 (维度: {dim}):")
-                            print(f"  前{args.vector_preview}个元素: {preview}")
-                            print(f"  范数: {np.linalg.norm(embedding):.4f}")
+                other_fields = [
+                    field for field in field_names
+                    if field in wanted and field not in {"text", "reference", "metadata", "embedding", "id"}
+                ]
+                headers = ["#", "ID", "文本", "参考", "元数据"]
+                if args.show_vectors:
+                    headers += ["向量维度", f"前{args.vector_preview}个元素", "范数"]
+                headers += other_fields
+                # 除序号、ID、向量维度和范数外的列都按原样显示，不做数字解析
+                text_columns = [2, 3, 4] + list(range(len(headers) - len(other_fields), len(headers)))
+                if args.show_vectors:
+                    text_columns.append(6)
+
+                # 不拉取向量时从schema中读取向量维度
+                schema_dim = ""
+                for field in fields:
+                    if field.get("name") == "embedding":
+                        schema_dim = field.get("params", {}).get("dim", "")
+
+                def render_rows(batch, start):
+                    # 一次性批量计算本批所有向量的范数
+                    norms = {}
+                    previews = {}
+                    if args.show_vectors:
+                        vector_rows = [
+                            i for i, item in enumerate(batch)
+                            if isinstance(item.get("embedding"), (list, np.ndarray))
+                        ]
+                        if vector_rows:
+                            embs = np.asarray(
+                                [batch[i]["embedding"] for i in vector_rows], dtype=np.float32
+                            )
+                            if args.quantize:
+                                values, batch_norms = _quantize(embs, args.quantize)
+                            else:
+                                values, batch_norms = embs, np.linalg.norm(embs, axis=1)
+                            previews = dict(
+                                zip(vector_rows, values[:, :args.vector_preview].tolist())
+                            )
+                            norms = dict(zip(vector_rows, np.asarray(batch_norms).tolist()))
+
+                    rows = []
+                    for i, item in enumerate(batch):
+                        row = [
+                            start + i,
+                            item.get("id", ""),
+                            _truncate(item.get("text") or ""),
+                            item.get("reference", ""),
+                            _dumps_metadata(item.get("metadata")),
+                        ]
+
+                        # 向量数据
+                        if args.show_vectors:
+                            embedding = item.get("embedding")
+                            if args.no_fetch_full_vector:
+                                row += [schema_dim, "", ""]
+                            elif i in norms:
+                                row += [
+                                    len(embedding),
+                                    previews[i],
+                                    norms[i],
+                                ]
+                            else:
+                                row += ["", embedding if embedding is not None else "", ""]
+
+                        # 其他字段
+                        row += [item.get(field, "") for field in other_fields]
+                        rows.append(row)
+                    return rows
+
+                # 大批量导出时每收到一批即按制表符分隔写出，跳过tabulate的列宽计算；
+                # 否则收集全部数据后只调用一次tabulate，保证各列对齐
+                bulk_output = args.limit >= BULK_OUTPUT_THRESHOLD
+
+                # 预先生成整行模板，每行只需调用一次format
+                row_template = "\t".join(["{}"] * len(headers))
+
+                # Milvus Lite不返回mvccTs，迭代器会告警并改用客户端时间戳，对只读的浏览场景没有影响，
+                # 仅在迭代器存续期间过滤掉这一条告警
+                iterator_logger = logging.getLogger("pymilvus.orm.iterator")
+                mvcc_filter = _MvccTsWarningFilter()
+                iterator_logger.addFilter(mvcc_filter)
+
+                iterator = None
+                shown = 0
+                rows = []
+                try:
+                    # 使用迭代器分批查询数据
+                    iterator = client.query_iterator(
+                        collection_name=args.collection,
+                        batch_size=max(1, min(256, args.limit)),
+                        limit=args.limit,
+                        filter="",
+                        output_fields=output_fields,
+                        offset=args.offset,
+                        consistency_level=args.consistency_level
+                    )
+                    while shown < args.limit:
+                        batch = iterator.next()
+                        if not batch:
+                            break
+                        batch = batch[:args.limit - shown]
+                        if shown == 0:
+                            print(f"\n数据 (从第 {args.offset + 1} 条开始):")
+                        batch_rows = render_rows(batch, args.offset + shown + 1)
+                        if bulk_output:
+                            if shown == 0:
+                                batch_rows.insert(0, headers)
+                            table = "\n".join(
+                                row_template.format(*map(_escape_cell, row)) for row in batch_rows
+                            )
+                            sys.stdout.write(table + "\n")
                         else:
-                            print(f"向量数据: {embedding}")
-                    
-                    # 显示其他字段
-                    for field in field_names:
-                        if field not in ["text", "reference", "metadata", "embedding", "id"] and field in item:
-                            print(f"{field}: {item[field]}")
+                            rows.extend(batch_rows)
+                        shown += len(batch)
+                finally:
+                    if iterator is not None:
+                        iterator.close()
+                    iterator_logger.removeFilter(mvcc_filter)
+
+                if rows:
+                    sys.stdout.write(
+                        tabulate(
+                            rows,
+                            headers=headers,
+                            tablefmt="plain",
+                            floatfmt=".4f",
+                            disable_numparse=text_columns,
+                        )
+                        + "\n"
+                    )
+
+                if not shown:
+                    print(f"集合 '{args.collection}' 中没有数据")
+                    return
+
+                print(f"\n(显示 {args.offset + 1} - {args.offset + shown} 条)")
             except Exception as e:
                 print(f"查询数据失败: {e}")
                 print(f"错误详情: {type(e).__name__}")
-                import traceback
-                traceback.print_exc()
+                if args.verbose:
+                    traceback.print_exc()
         except Exception as e:
             print(f"获取集合信息失败: {e}")
 
@@ -20,6 +20,9 @@ setup(
         "uvicorn",
         "pydantic-settings",
     ],
+    extras_require={
+        "orjson": ["orjson"],
+    },
     entry_points={
         "console_scripts": ["deepsearcher=deepsearcher.cli:main"],
     },
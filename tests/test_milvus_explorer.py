@@ -0,0 +1,157 @@
+import io
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from deepsearcher.vector_db import Milvus, RetrievalResult
+
+import milvus_explorer
+
+
+class TestMilvusExplorer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.uri = os.path.join(cls.tmp_dir, "explorer.db")
+        cls.collection = "hello_explorer"
+        cls.milvus = Milvus(uri=cls.uri)
+        cls.milvus.init_collection(dim=4, collection=cls.collection)
+        cls.embeddings = [
+            [1.0, 0.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0, 0.0],
+        ]
+        cls.milvus.insert_data(
+            collection=cls.collection,
+            chunks=[
+                RetrievalResult(
+                    embedding=embedding,
+                    text=f"hello explorer {i}",
+                    reference="local file: hi.txt",
+                    metadata={"a": i},
+                )
+                for i, embedding in enumerate(cls.embeddings)
+            ]
+            + [
+                RetrievalResult(
+                    embedding=[0.0, 0.0, 0.0, 1.0],
+                    text="line one\tcol\nline two",
+                    reference="local file: multiline.txt",
+                    metadata={},
+                )
+            ],
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.milvus.client.close()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def run_explorer(self, *argv):
+        out = io.StringIO()
+        with mock.patch.object(sys, "argv", ["milvus_explorer.py", "--uri", self.uri, *argv]):
+            with redirect_stdout(out):
+                milvus_explorer.main()
+        return out.getvalue()
+
+    def test_search_vector(self):
+        output = self.run_explorer(
+            "--collection", self.collection,
+            "--search",
+            "--search_vector", "[1.0, 0.0, 0.0, 0.0]",
+            "--top_k", "2",
+        )
+        self.assertIn("找到 2 个相似结果", output)
+        self.assertIn("hello explorer 0", output)
+        self.assertIn("0.0000", output)
+        self.assertIn("local file: hi.txt", output)
+        self.assertNotIn("执行向量搜索失败", output)
+
+    def test_search_oversample(self):
+        output = self.run_explorer(
+            "--collection", self.collection,
+            "--search",
+            "--search_vector", "[0.0, 0.0, 1.0, 0.0]",
+            "--top_k", "1",
+            "--oversample", "3",
+        )
+        self.assertIn("找到 1 个相似结果", output)
+        self.assertIn("hello explorer 2", output)
+        self.assertNotIn("执行向量搜索失败", output)
+
+    def test_bulk_output_escapes_cells(self):
+        output = self.run_explorer("--collection", self.collection, "--limit", "1000")
+        self.assertIn("line one\\tcol\\nline two", output)
+        data_lines = output.split("数据 (从第 1 条开始):\n")[1].split("\n\n")[0].splitlines()
+        # 表头 + 4条数据，每条数据只占一行
+        self.assertEqual(len(data_lines), 5)
+
+    def test_collection_view(self):
+        output = self.run_explorer("--collection", self.collection, "--limit", "2", "--offset", "1")
+        data_lines = output.split("数据 (从第 2 条开始):\n")[1].split("\n\n")[0].splitlines()
+        # 表头 + 2条数据，所有数据行共用一套列宽
+        self.assertEqual(len(data_lines), 3)
+        self.assertEqual(data_lines[1].index("hello explorer 1"), data_lines[2].index("hello explorer 2"))
+        self.assertIn("(显示 2 - 3 条)", output)
+        # mvccTs告警过滤只在迭代器存续期间生效
+        self.assertEqual(logging.getLogger("pymilvus.orm.iterator").filters, [])
+
+    def vector_row(self, output, text):
+        data = output.split("数据 (从第 1 条开始):\n")[1]
+        return next(line for line in data.splitlines() if text in line)
+
+    def test_show_vectors(self):
+        output = self.run_explorer("--collection", self.collection, "--limit", "3", "--show_vectors")
+        row = self.vector_row(output, "hello explorer 0")
+        self.assertRegex(row, r"\b4\s+\[1\.0, 0\.0, 0\.0, 0\.0\]\s+1\.0000")
+        self.assertNotIn("np.float32", output)
+
+    def test_show_vectors_quantize_int8(self):
+        output = self.run_explorer(
+            "--collection", self.collection, "--limit", "3", "--show_vectors", "--quantize", "int8"
+        )
+        row = self.vector_row(output, "hello explorer 1")
+        self.assertRegex(row, r"\b4\s+\[0, 127, 0, 0\]\s+1\.0000")
+
+    def test_show_vectors_no_fetch_full_vector(self):
+        output = self.run_explorer(
+            "--collection", self.collection, "--limit", "3", "--show_vectors", "--no_fetch_full_vector"
+        )
+        row = self.vector_row(output, "hello explorer 2")
+        self.assertRegex(row, r"\b4\s*$")
+        self.assertNotIn("[", row)
+
+    def test_dumps_metadata_without_orjson(self):
+        metadata = {"a": 1, "中文": [1, 2]}
+        expected = milvus_explorer._dumps_metadata(metadata)
+        with mock.patch.object(milvus_explorer, "orjson", None):
+            self.assertEqual(milvus_explorer._dumps_metadata(metadata), expected)
+        self.assertEqual(expected, '{"a":1,"中文":[1,2]}')
+
+    def test_search_id(self):
+        ids = [
+            row["id"]
+            for row in self.milvus.client.query(
+                collection_name=self.collection,
+                filter='text == "hello explorer 1"',
+                output_fields=["id"],
+            )
+        ]
+        output = self.run_explorer(
+            "--collection", self.collection,
+            "--search",
+            "--search_id", str(ids[0]),
+            "--top_k", "1",
+        )
+        self.assertIn(f"使用ID {ids[0]} 的向量进行搜索", output)
+        self.assertIn("hello explorer 1", output)
+        self.assertNotIn("执行向量搜索失败", output)
+
+
+if __name__ == "__main__":
+    unittest.main()